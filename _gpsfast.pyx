@@ -0,0 +1,88 @@
+# cython: language_level=3
+"""compiled hot path for main.py: NMEA tokenizing, checksum and CSV row
+formatting, same contracts as the pure-Python versions in main.py
+
+build in place with:
+    pip install cython
+    python setup.py build_ext --inplace
+
+main.py falls back to the pure-Python implementations when this module
+is not built.
+"""
+import calendar
+
+
+cpdef int nmea_checksum(bytes payload):
+    cdef const unsigned char* p = payload
+    cdef Py_ssize_t i, n = len(payload)
+    cdef unsigned char checksum = 0
+    for i in range(n):
+        checksum ^= p[i]
+    return checksum
+
+
+cdef double nmea_to_decimal(bytes value, bytes hemisphere):
+    cdef double v = float(value)
+    cdef int degrees = <int>(v / 100)
+    cdef double decimal = degrees + (v - degrees * 100) / 60
+    if hemisphere == b"S" or hemisphere == b"W":
+        return -decimal
+    return decimal
+
+
+cpdef parse_nmea(bytes line):
+    """see main.parse_nmea: returns (type, value) or None"""
+    cdef Py_ssize_t start = line.find(b"$")
+    cdef Py_ssize_t star = line.rfind(b"*")
+    if start < 0 or star <= start:
+        return None
+    cdef bytes payload = line[start + 1 : star]
+    cdef list fields
+    cdef bytes sentence_type, t, d
+    try:
+        if nmea_checksum(payload) != int(line[star + 1 : star + 3], 16):
+            return None
+
+        fields = payload.split(b",")
+        sentence_type = fields[0][-3:]
+        if sentence_type == b"RMC":
+            # $xxRMC,time,status,lat,NS,lon,EW,sog,cog,date,...
+            latitude = longitude = timestamp = None
+            if fields[3] and fields[5]:
+                latitude = nmea_to_decimal(fields[3], fields[4])
+                longitude = nmea_to_decimal(fields[5], fields[6])
+            if fields[1] and fields[9]:
+                t, d = fields[1], fields[9]
+                timestamp = calendar.timegm(
+                    (
+                        2000 + int(d[4:6]),
+                        int(d[2:4]),
+                        int(d[0:2]),
+                        int(t[0:2]),
+                        int(t[2:4]),
+                        int(t[4:6]),
+                        0,
+                        0,
+                        0,
+                    )
+                )
+            return ("RMC", (latitude, longitude, timestamp))
+        if sentence_type == b"GGA":
+            # $xxGGA,time,lat,NS,lon,EW,quality,numSV,HDOP,alt,...
+            return ("GGA", float(fields[9]) if fields[9] else None)
+        if sentence_type == b"VTG":
+            # $xxVTG,cogt,T,cogm,M,sog_knots,N,sog_kmh,K
+            return ("VTG", float(fields[7]) if fields[7] else None)
+    except (ValueError, IndexError):
+        return None
+    return None
+
+
+cpdef bytes format_csv_row(dict data):
+    return b"%d,%.7f,%.7f,%.2f,%.2f\n" % (
+        data["GPSTimestamp"],
+        data["latitude"],
+        data["longitude"],
+        data["altitude"],
+        data["speed"],
+    )
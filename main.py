@@ -11,18 +11,37 @@ And upload formatted data to HTTP server.
 """
 import serial
 import serial.tools.list_ports
-import pynmea2
 import asyncio
+import calendar
+import concurrent.futures
 import os
+import random
+import time
 import httpx
+import orjson
 from dotenv import load_dotenv
 import datetime
 from functools import wraps
 from pathlib import Path
-import aiofiles
 from typing import Union, List
 from typing_extensions import Never
 
+# drop-in libuv event loop, much cheaper task switching than the stock
+# selector loop; not available on Windows, where the default is kept
+try:
+    import uvloop
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
+# numpy is optional, only used to bulk-parse the stored CSV on startup;
+# the pure-Python fallback below is fine for small backlogs
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore
+
 load_dotenv(override=True)
 
 
@@ -37,6 +56,8 @@ TRIGGER_STOP_TIME: int = int(os.getenv("TRIGGER_STOP_TIME", 20))  # 300 seconds
 TRIGGER_STOP_SPEED: float = float(os.getenv("TRIGGER_STOP_SPEED", 0.5))  # 0.5 km/h
 # number of GPS data per upload
 NUM_PER_UPLOAD: int = int(os.getenv("NUM_PER_UPLOAD", 100))
+# flush a partially filled upload batch after this many seconds
+FLUSH_INTERVAL: int = int(os.getenv("FLUSH_INTERVAL", 5))
 CHECK_NETWORK_INTERVAL: int = int(os.getenv("CHECK_NETWORK_INTERVAL", 5))  # 10 seconds
 DEBUG: bool = bool(os.getenv("DEBUG", False))
 ################# Config End ##############
@@ -45,13 +66,34 @@ if not GPSFILEDIR.exists():
     GPSFILEDIR.mkdir()
 ser = None
 ser_readline = None
+last_cache_clear = time.monotonic()
 error_count = 0
 max_error_count = 5
+# read iterations before get_gps_data gives up waiting for optional
+# sentences (VTG/GGA) and returns a partial fix with defaults
+max_fix_iters = 500
 is_network_available = None
 upload_queue = asyncio.Queue()
+# batches waiting to be uploaded: bounded, so a slow network
+# backpressures the GPS loop instead of piling up upload tasks
+upload_batch_queue: asyncio.Queue = asyncio.Queue(maxsize=32)
+UPLOAD_WORKERS = 2
+# dedicated single thread for blocking pyserial reads, so a slow serial
+# read never competes with the default executor used elsewhere
+serial_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="serial"
+)
+# persistent HTTP/2 client: keep a few warm connections to the API host
+# so batched uploads never pay TCP/TLS setup again
 Aclient = httpx.AsyncClient(
     verify=False,
-    timeout=8,
+    timeout=5,
+    http2=True,
+    limits=httpx.Limits(
+        max_keepalive_connections=8,
+        max_connections=16,
+        keepalive_expiry=60,
+    ),
 )
 # prefix with / and suffix with /, like /gps/upload/
 API_ROUTES = {
@@ -59,6 +101,12 @@ API_ROUTES = {
     "mutil_gps": "/gps/upload/multi/",
     "ping": "/ping/",
 }
+# prebuilt upload URLs, no f-string per request
+GPS_UPLOAD_URL = f"{API_URL}{API_ROUTES['gps']}"
+MULTI_UPLOAD_URL = f"{API_URL}{API_ROUTES['mutil_gps']}"
+PING_URL = f"{API_URL}{API_ROUTES['ping']}"
+# encode request bodies with orjson instead of httpx's stdlib json path
+JSON_HEADERS = {"content-type": "application/json"}
 
 ######### Helper Functions ############
 
@@ -73,22 +121,43 @@ class ReadLine:
         self.s = s
 
     def readline(self) -> bytearray:
-        i = self.buf.find(b"\n")
-        if i >= 0:
-            r = self.buf[: i + 1]
-            self.buf = self.buf[i + 1 :]
-            return r
+        # partition splits and reslices in one C call instead of
+        # find + two copying slices on the common buffered-hit path
+        line, sep, rest = self.buf.partition(b"\n")
+        if sep:
+            self.buf = rest
+            return line + sep
         while True:
-            i = max(1, min(2048, self.s.in_waiting))
-            data = self.s.read(i)
-            i = data.find(b"\n")
-            if i >= 0:
-                r = self.buf + data[: i + 1]
-                self.buf[0:] = data[i + 1 :]
+            # ask for at least 64 bytes when the port is idle instead of
+            # a blocking 1-byte read per iteration; no upper cap, pyserial
+            # returns whatever has arrived within the timeout
+            data = self.s.read(self.s.in_waiting or 64)
+            line, sep, rest = data.partition(b"\n")
+            if sep:
+                r = self.buf + line + sep
+                self.buf = bytearray(rest)
                 return r
             else:
                 self.buf.extend(data)
 
+    def read_lines(self) -> List[bytes]:
+        """drain everything waiting on the port in one read() and return
+        all complete lines, keeping the trailing partial sentence buffered
+        """
+        data = self.s.read(self.s.in_waiting or 64)
+        self.buf.extend(data)
+        if b"\n" not in self.buf:
+            return []
+        # splitlines handles \r\n and strips the terminators at C speed;
+        # NMEA is plain ASCII so lines stay raw bytes all the way into
+        # parse_nmea, no utf-8 decode anywhere
+        lines = bytes(self.buf).splitlines()
+        if self.buf.endswith(b"\n"):
+            self.buf.clear()
+        else:
+            self.buf = bytearray(lines.pop())
+        return lines
+
 
 def print(msg, *args, **kwargs):
     """overwrite print function in order to optimize"""
@@ -107,20 +176,16 @@ def knots_to_kmh(knots: float) -> float:
     return knots * 1.852
 
 
-# safely get object attribute
-def safe_getattr(obj, attr, default=None):
-    try:
-        return getattr(obj, attr)
-    except AttributeError:
-        return default
-
-
-# decide if the dict attribute is None
-def dict_is_none(data: dict) -> bool:
-    for k, v in data.items():
-        if v is None:
-            return True
-    return False
+# drain up to limit already-queued items without awaiting,
+# so one wakeup of the consumer handles the whole backlog
+def drain_queue_nowait(queue: asyncio.Queue, limit: int) -> List:
+    items: List = []
+    while len(items) < limit:
+        try:
+            items.append(queue.get_nowait())
+        except asyncio.QueueEmpty:
+            break
+    return items
 
 
 # raise error and count
@@ -131,35 +196,201 @@ def raise_error(e: Exception):
         raise e
 
 
+# decay the error count on success, so a long run only dies on a burst
+# of consecutive errors instead of the 6th transient blip ever seen
+def decay_error():
+    global error_count
+    if error_count > 0:
+        error_count -= 1
+
+
 # according to datetime.time and datetime.date to get timestamp
+# NMEA time/date are UTC, so use timegm and skip the local-timezone
+# conversion that datetime.timestamp() would do per sentence
 def get_timestamp(time: datetime.time, date: datetime.date) -> int:
-    return int(datetime.datetime.combine(date, time).timestamp())
+    return calendar.timegm(
+        (date.year, date.month, date.day, time.hour, time.minute, time.second, 0, 0, 0)
+    )
 
 
 # async function retry decorator
+# exponential backoff with jitter, honours Retry-After on 429/503 and
+# re-raises the last error instead of silently returning None
 def aretry(times: int = 3, interval: float = 1):
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
+            last_error: Exception = Exception("aretry: no attempt made")
             for i in range(times):
                 try:
                     return await func(*args, **kwargs)
+                except httpx.HTTPStatusError as e:
+                    last_error = e
+                    print(f"HTTP status error: {e} retry {i+1} times.")
+                    if e.response.status_code in (429, 503):
+                        retry_after = e.response.headers.get("Retry-After")
+                        try:
+                            await asyncio.sleep(float(retry_after))  # type: ignore
+                            continue
+                        except (TypeError, ValueError):
+                            pass
                 except httpx.HTTPError as e:
+                    last_error = e
                     print(f"HTTP connect error: {e} retry {i+1} times.")
                 except Exception as e:
+                    last_error = e
                     print(f"retry {i+1} times, error: {e}")
 
-                await asyncio.sleep(interval)
+                await asyncio.sleep(interval * 2**i + random.random() * 0.1)
+
+            raise last_error
 
         return wrapper
 
     return decorator
 
 
+# cache of (day ordinal, Path) so the per-sample call below is a
+# single integer compare instead of strftime + Path construction
+_gps_filepath_cache = (0, None)
+
+
 # generate GPS file subfix with date like gps_2024-02-02.csv
 def gen_gps_filepath() -> Path:
-    filename = datetime.datetime.now().strftime("gps_%Y_%m_%d.csv")
-    return Path(GPSFILEDIR, filename)
+    global _gps_filepath_cache
+    today = datetime.date.today()
+    if today.toordinal() != _gps_filepath_cache[0]:
+        filename = today.strftime("gps_%Y_%m_%d.csv")
+        _gps_filepath_cache = (today.toordinal(), Path(GPSFILEDIR, filename))
+    return _gps_filepath_cache[1]
+
+
+# long-lived append-only fd for the current day's GPS file,
+# opened once per day instead of once per sample
+gps_fd = None
+gps_fd_path = None
+
+
+def get_gps_fd() -> int:
+    """return the O_APPEND fd of the current day's GPS file,
+    rotating it when the date changes"""
+    global gps_fd, gps_fd_path
+    filepath = gen_gps_filepath()
+    if gps_fd is None or filepath != gps_fd_path:
+        if gps_fd is not None:
+            os.close(gps_fd)
+        gps_fd = os.open(filepath, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        gps_fd_path = filepath
+    return gps_fd
+
+
+# XOR of all payload bytes between $ and *
+# fold 8 bytes at a time through one big int instead of a Python-level
+# per-byte loop, then collapse the accumulator to a single byte
+def nmea_checksum(payload: bytes) -> int:
+    n = len(payload)
+    end8 = n - (n % 8)
+    acc = 0
+    for i in range(0, end8, 8):
+        acc ^= int.from_bytes(payload[i : i + 8], "little")
+    checksum = 0
+    while acc:
+        checksum ^= acc & 0xFF
+        acc >>= 8
+    for b in payload[end8:]:
+        checksum ^= b
+    return checksum
+
+
+# convert NMEA ddmm.mmmm plus hemisphere to signed decimal degrees
+def nmea_to_decimal(value: bytes, hemisphere: bytes) -> float:
+    v = float(value)
+    degrees = int(v / 100)
+    decimal = degrees + (v - degrees * 100) / 60
+    if hemisphere in (b"S", b"W"):
+        return -decimal
+    return decimal
+
+
+def parse_nmea(line: bytes):
+    """hand-written tokenizer for the only three sentence types we need
+
+    pynmea2 does generic class dispatch, regex matching and per-field
+    coercion just so we can pluck 5 numbers; a checksum + split + float
+    is much cheaper in the hot loop.
+
+    Returns (type, value) or None for invalid/uninteresting sentences:
+        ("GGA", altitude)
+        ("RMC", (latitude, longitude, timestamp))  # items may be None
+        ("VTG", speed_kmh)
+    """
+    start = line.find(b"$")
+    star = line.rfind(b"*")
+    if start < 0 or star <= start:
+        return None
+    payload = line[start + 1 : star]
+    try:
+        if nmea_checksum(payload) != int(line[star + 1 : star + 3], 16):
+            return None
+
+        fields = payload.split(b",")
+        sentence_type = fields[0][-3:]
+        if sentence_type == b"RMC":
+            # $xxRMC,time,status,lat,NS,lon,EW,sog,cog,date,...
+            latitude = longitude = timestamp = None
+            if fields[3] and fields[5]:
+                latitude = nmea_to_decimal(fields[3], fields[4])
+                longitude = nmea_to_decimal(fields[5], fields[6])
+            if fields[1] and fields[9]:
+                t, d = fields[1], fields[9]
+                timestamp = calendar.timegm(
+                    (
+                        2000 + int(d[4:6]),
+                        int(d[2:4]),
+                        int(d[0:2]),
+                        int(t[0:2]),
+                        int(t[2:4]),
+                        int(t[4:6]),
+                        0,
+                        0,
+                        0,
+                    )
+                )
+            return ("RMC", (latitude, longitude, timestamp))
+        if sentence_type == b"GGA":
+            # $xxGGA,time,lat,NS,lon,EW,quality,numSV,HDOP,alt,...
+            return ("GGA", float(fields[9]) if fields[9] else None)
+        if sentence_type == b"VTG":
+            # $xxVTG,cogt,T,cogm,M,sog_knots,N,sog_kmh,K
+            return ("VTG", float(fields[7]) if fields[7] else None)
+    except (ValueError, IndexError):
+        return None
+    return None
+
+
+# format one gps data dict as a CSV row: timestamp,lat,lon,alt,speed
+# bytes %-formatting uses CPython's C formatter and skips the
+# str-then-encode round trip on the way to os.write
+def format_csv_row(data: dict) -> bytes:
+    return b"%d,%.7f,%.7f,%.2f,%.2f\n" % (
+        data["GPSTimestamp"],
+        data["latitude"],
+        data["longitude"],
+        data["altitude"],
+        data["speed"],
+    )
+
+
+# optional compiled hot path, built with `python setup.py build_ext --inplace`
+# (needs cython); falls back to the pure-Python functions above
+try:
+    import _gpsfast
+
+    nmea_checksum = _gpsfast.nmea_checksum
+    parse_nmea = _gpsfast.parse_nmea
+    format_csv_row = _gpsfast.format_csv_row
+except ImportError:
+    pass
 
 
 # check network task: check if the network is available
@@ -167,8 +398,7 @@ async def check_network_task() -> Never:
     global is_network_available
     while True:
         try:
-            response = await Aclient.get(f"{API_URL}{API_ROUTES['ping']}")
-            await response.aclose()
+            response = await Aclient.get(PING_URL)
             is_network_available = True
             print("network is available")
         except Exception as e:
@@ -186,7 +416,7 @@ async def init():
     print("initialization...")
     while True:
         try:
-            ser = serial.Serial(SERIAL, 115200, timeout=1)
+            ser = serial.Serial(SERIAL, BAUDRATE, timeout=0.05)
             ser_readline = ReadLine(ser)
             return
         except Exception as e:
@@ -194,6 +424,17 @@ async def init():
             await asyncio.sleep(5)
 
 
+def read_and_parse() -> list:
+    """one blocking bulk read plus the parse of every complete sentence;
+    runs on the serial executor so parser CPU stays off the event loop
+    thread and the thread hop is paid once per batch, not per sentence"""
+    return [
+        parsed
+        for parsed in map(parse_nmea, ser_readline.read_lines())  # type: ignore
+        if parsed is not None
+    ]
+
+
 async def get_gps_data() -> dict:
     """get gps data from serial port`
 
@@ -207,31 +448,42 @@ async def get_gps_data() -> dict:
             "GPSTimestamp": 0,
         }
     """
-    data = {
-        "latitude": None,
-        "longitude": None,
-        "altitude": None,
-        "speed": None,
-        "GPSTimestamp": None,
-    }
-    while dict_is_none(data):
+    global last_cache_clear
+    latitude = longitude = altitude = speed = gps_timestamp = None
+    # completion bitmask: one integer compare per iteration instead of
+    # walking a dict of Nones (GGA=1, RMC pos=2, RMC time=4, VTG=8)
+    filled_mask = 0
+    iters = 0
+    loop = asyncio.get_event_loop()
+    while filled_mask != 0b1111:
+        # some receivers never emit VTG (or GGA): once position and time
+        # are in, stop waiting for the optional fields after a while and
+        # default them instead of spinning here forever
+        iters += 1
+        if iters > max_fix_iters and filled_mask & 0b0110 == 0b0110:
+            if not filled_mask & 0b0001:
+                altitude = 0.0
+            if not filled_mask & 0b1000:
+                speed = 0.0
+            break
         if ser_readline is None or ser is None:
             print("ser_readline is None, retry in 1s...")
             await asyncio.sleep(1)
             continue
         try:
-            # the cache is cleared every minute
-            if datetime.datetime.now().second == 0 and ser_readline.buf:
-                ser_readline.buf.clear()
-                ser.reset_input_buffer()
-                print("clear cache...")
-            line = ser_readline.readline().decode("utf-8")  # type: ignore
-            msg = pynmea2.parse(line)
-        except pynmea2.ParseError as e:
-            print(f"nmea parse error: {e}")
-            raise_error(e)
-            await asyncio.sleep(1)
-            continue
+            # the cache is cleared every minute; time.monotonic is far
+            # cheaper than building a datetime per iteration and can't
+            # fire several times within the same wall-clock second
+            now = time.monotonic()
+            if now - last_cache_clear > 60:
+                last_cache_clear = now
+                if ser_readline.buf:
+                    ser_readline.buf.clear()
+                    ser.reset_input_buffer()
+                    print("clear cache...")
+            # bulk read and parse off the event loop, one executor hop
+            # per batch of sentences
+            messages = await loop.run_in_executor(serial_executor, read_and_parse)
         except serial.SerialException as e:
             print(f"serial error: {e}")
             raise_error(e)
@@ -243,84 +495,109 @@ async def get_gps_data() -> dict:
             await asyncio.sleep(1)
             continue
 
-        if isinstance(msg, pynmea2.GGA):
-            data["altitude"] = safe_getattr(msg, "altitude")
-        elif isinstance(msg, pynmea2.RMC):
-            latitude = safe_getattr(msg, "latitude")
-            longitude = safe_getattr(msg, "longitude")
-            if latitude is not None and longitude is not None:
-                data["latitude"] = round(latitude, 7)  # type: ignore
-                data["longitude"] = round(longitude, 7)  # type: ignore
-
-            timestamp = safe_getattr(msg, "timestamp")
-            datestamp = safe_getattr(msg, "datestamp")
-            if timestamp is not None and datestamp is not None:
-                data["GPSTimestamp"] = get_timestamp(timestamp, datestamp)  # type: ignore
-
-        elif isinstance(msg, pynmea2.VTG):
-            data["speed"] = safe_getattr(msg, "spd_over_grnd_kmph")
-
-        else:
-            # print("positioning...", end="\r")
-            pass
-
-        # await asyncio.sleep(0.1)
+        for parsed in messages:
+            decay_error()
+
+            sentence_type, value = parsed
+            if sentence_type == "GGA":
+                if value is not None:
+                    altitude = value
+                    filled_mask |= 0b0001
+            elif sentence_type == "RMC":
+                lat, lon, timestamp = value
+                if lat is not None and lon is not None:
+                    latitude = round(lat, 7)
+                    longitude = round(lon, 7)
+                    filled_mask |= 0b0010
+                if timestamp is not None:
+                    gps_timestamp = timestamp
+                    filled_mask |= 0b0100
+            elif sentence_type == "VTG":
+                if value is not None:
+                    speed = value
+                    filled_mask |= 0b1000
 
+    data = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "altitude": altitude,
+        "speed": speed,
+        "GPSTimestamp": gps_timestamp,
+    }
     print(f"success get gps data: {data}")
     return data
 
 
-@aretry(times=3, interval=0.5)
 async def upload_gps_data(data: Union[dict, List[dict]]):
-    """upload formatted gps data to HTTP server"""
-    global is_network_available, Aclient
+    """upload formatted gps data to HTTP server
+
+    empty batches and known-offline periods return immediately, before
+    the retry wrapper, so they cost no backoff sleeps at all
+    """
+    if not data:
+        return
     if not is_network_available and is_network_available is not None:
         print("network is not available, upload stop...")
         return
+    return await _upload_gps_data_retried(data)
 
+
+@aretry(times=3, interval=0.5)
+async def _upload_gps_data_retried(data: Union[dict, List[dict]]):
     if isinstance(data, dict):
-        response = await Aclient.post(f"{API_URL}{API_ROUTES['gps']}", json=data)
+        response = await Aclient.post(
+            GPS_UPLOAD_URL, content=orjson.dumps(data), headers=JSON_HEADERS
+        )
+        response.raise_for_status()
         print(f"upload success: {response.status_code} {response.text}")
-        await response.aclose()
     elif isinstance(data, list):
-        response = await Aclient.post(f"{API_URL}{API_ROUTES['mutil_gps']}", json=data)
+        response = await Aclient.post(
+            MULTI_UPLOAD_URL, content=orjson.dumps(data), headers=JSON_HEADERS
+        )
+        response.raise_for_status()
         print(f"upload multiple success: {response.status_code} {response.text}")
-        await response.aclose()
 
 
 async def upload_store_gps_data():
     """upload stored gps data to HTTP server"""
     datas = await read_gps_data(gen_gps_filepath())
-    lst = []
-    if datas is None:
+    if not datas:
         return
-    for data in datas:
-        if data is None:
-            continue
-        # upload data when the number of data count > NUM_PER_UPLOAD
-        lst.append(data)
-        if len(lst) >= NUM_PER_UPLOAD:
-            await upload_gps_data(lst)
-            lst.clear()
 
-    # upload remaining data
-    if lst:
-        await upload_gps_data(lst)
-        lst.clear()
+    # shard into NUM_PER_UPLOAD batches and upload them concurrently,
+    # bounded to the client's keep-alive pool so the history backlog
+    # can't hog every connection while the live loop runs
+    semaphore = asyncio.Semaphore(8)
+
+    async def upload_batch(batch: List[dict]):
+        async with semaphore:
+            await upload_gps_data(batch)
+
+    batches = [
+        datas[i : i + NUM_PER_UPLOAD] for i in range(0, len(datas), NUM_PER_UPLOAD)
+    ]
+    try:
+        await asyncio.gather(*[upload_batch(batch) for batch in batches])
+    except Exception as e:
+        print(f"upload store gps error: {e}")
+        return
 
     print("upload store gps success")
 
 
-async def save_gps_data(data: dict):
+def save_gps_data(data: Union[dict, List[dict]]):
     """save formatted gps data to local file
 
     format: timestamp,latitude,longitude,altitude,speed
     CSV format
     """
-    async with aiofiles.open(gen_gps_filepath().as_posix(), "a", encoding="utf8") as f:
-        await f.write(
-            f"{data['GPSTimestamp']},{data['latitude']},{data['longitude']},{data['altitude']},{data['speed']}\n"
-        )
+    fd = get_gps_fd()
+    if isinstance(data, dict):
+        data = [data]
+    # one os.write per batch: an append to a local file rarely blocks,
+    # so going straight to the fd skips the buffered layer (and the
+    # flush bookkeeping) without bouncing to a thread
+    os.write(fd, b"".join(map(format_csv_row, data)))
 
 
 async def read_gps_data(filepath: Path) -> Union[None, list[dict]]:
@@ -340,21 +617,38 @@ async def read_gps_data(filepath: Path) -> Union[None, list[dict]]:
     if not filepath.exists():
         return None
 
-    lst = []
-    async with aiofiles.open(filepath.as_posix(), "r", encoding="utf8") as f:
-        lines = await f.readlines()
-        for line in lines:
-            data_lst = line.strip().split(",")
-            data_dict = {
-                "GPSTimestamp": int(data_lst[0]),
-                "latitude": float(data_lst[1]),
-                "longitude": float(data_lst[2]),
-                "altitude": float(data_lst[3]),
-                "speed": float(data_lst[4]),
+    loop = asyncio.get_event_loop()
+
+    if numpy is not None:
+        # after a long offline stretch this file holds tens of thousands
+        # of rows; loadtxt keeps the whole parse in C on a worker thread
+        arr = await loop.run_in_executor(
+            None, lambda: numpy.loadtxt(filepath, delimiter=",", ndmin=2)
+        )
+        return [
+            {
+                "GPSTimestamp": int(row[0]),
+                "latitude": row[1],
+                "longitude": row[2],
+                "altitude": row[3],
+                "speed": row[4],
             }
-            lst.append(data_dict)
+            for row in arr.tolist()
+        ]
 
-    return lst
+    # one executor hop for the whole file instead of one per line,
+    # then split and parse at C speed
+    text = await loop.run_in_executor(None, filepath.read_text, "utf8")
+    return [
+        {
+            "GPSTimestamp": int(data_lst[0]),
+            "latitude": float(data_lst[1]),
+            "longitude": float(data_lst[2]),
+            "altitude": float(data_lst[3]),
+            "speed": float(data_lst[4]),
+        }
+        for data_lst in (line.split(",") for line in text.splitlines())
+    ]
 
 
 async def get_gps_loop() -> Never:
@@ -363,18 +657,20 @@ async def get_gps_loop() -> Never:
     stop_timestamp = 0
     while True:
         data = await get_gps_data()
+        # coerce once: speed may be a defaulted partial-fix field and the
+        # dict lookups don't need repeating throughout the checks below
+        speed = data["speed"] or 0.0
+        gps_timestamp = data["GPSTimestamp"]
 
         # if speed is less than `TRIGGER_STOP_SPEED` km/h for 5 minutes, ignore it
-        if data["speed"] < TRIGGER_STOP_SPEED:
+        if speed < TRIGGER_STOP_SPEED:
             if not stopping:
-                stop_timestamp = data["GPSTimestamp"]  # first stop timestamp
+                stop_timestamp = gps_timestamp  # first stop timestamp
                 stopping = True
                 print(f"first stop at {stop_timestamp}")
             else:
-                print(
-                    f"had stopped...{data['GPSTimestamp'] - stop_timestamp} seconds..."
-                )
-                if data["GPSTimestamp"] - stop_timestamp > TRIGGER_STOP_TIME:
+                print(f"had stopped...{gps_timestamp - stop_timestamp} seconds...")
+                if gps_timestamp - stop_timestamp > TRIGGER_STOP_TIME:
                     print(f"had stopped for {TRIGGER_STOP_TIME} seconds, ignore it")
                     ignore = True
         else:
@@ -385,35 +681,56 @@ async def get_gps_loop() -> Never:
         if (not ignore) or DISABLE_IGNORE_STOP:
             await upload_queue.put(data)
 
-        await asyncio.sleep(1)
+        # no sleep here: get_gps_data blocks on the serial port until a
+        # full fix arrives, so the GPS output rate paces this loop
 
 
 async def handle_gps_loop() -> Never:
+    loop = asyncio.get_event_loop()
     while True:
-        queue_size = upload_queue.qsize()
-        print("remain data in queue:", queue_size)
-        if queue_size >= 10:
-            print("queue is large, upload data...")
-            lst = []
-            for _ in range(queue_size):
-                data = await upload_queue.get()
-                lst.append(data)
-                await save_gps_data(data)
-                upload_queue.task_done()
-            asyncio.ensure_future(upload_gps_data(lst))
-            lst.clear()
-            continue
-
-        data = await upload_queue.get()
-        # await asyncio.gather(*[upload_gps_data(data), save_gps_data(data)])
-        await save_gps_data(data)
-        asyncio.ensure_future(upload_gps_data(data))
-        upload_queue.task_done()
+        # gather a batch: up to NUM_PER_UPLOAD items or FLUSH_INTERVAL
+        # seconds, whichever comes first, so one POST and one CSV write
+        # cover the whole batch instead of one of each per sample
+        batch = [await upload_queue.get()]
+        batch.extend(drain_queue_nowait(upload_queue, NUM_PER_UPLOAD - 1))
+        deadline = loop.time() + FLUSH_INTERVAL
+        while len(batch) < NUM_PER_UPLOAD:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(upload_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+            batch.extend(
+                drain_queue_nowait(upload_queue, NUM_PER_UPLOAD - len(batch))
+            )
+
+        print("upload batch size:", len(batch))
+        save_gps_data(batch)
+        await upload_batch_queue.put(batch)
+        for _ in batch:
+            upload_queue.task_done()
+
+
+async def upload_worker() -> Never:
+    """consume batches from upload_batch_queue, a fixed pool of these
+    replaces one fire-and-forget task per batch"""
+    while True:
+        batch = await upload_batch_queue.get()
+        try:
+            await upload_gps_data(batch)
+        except Exception as e:
+            print(f"upload worker error: {e}")
+        finally:
+            upload_batch_queue.task_done()
 
 
 async def main():
     asyncio.ensure_future(check_network_task())
     asyncio.ensure_future(upload_store_gps_data())
+    for _ in range(UPLOAD_WORKERS):
+        asyncio.ensure_future(upload_worker())
 
     await init()
     tasks = [get_gps_loop(), handle_gps_loop()]
@@ -423,7 +740,10 @@ async def main():
 if __name__ == "__main__":
     # in python 3.9 if use asyncio.run(main()) will raise Queue loop attached to a different loop error
     # asyncio.run(main())
-    loop = asyncio.get_event_loop()
+    # uvloop's policy has no implicit loop creation in get_event_loop,
+    # so create and install the loop explicitly
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
     loop.run_until_complete(main())
     if isinstance(ser, serial.Serial):
         ser.close()
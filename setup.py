@@ -0,0 +1,11 @@
+#!/usr/bin/env python
+# build the optional compiled hot path:
+#   pip install cython
+#   python setup.py build_ext --inplace
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name="pygps-fast",
+    ext_modules=cythonize("_gpsfast.pyx", language_level=3),
+)